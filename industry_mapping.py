@@ -1044,3 +1044,11 @@ industry_mapping = {
         "Home help service agency": "Home help service agency"
     }
 }
+
+# Flat reverse lookup built once at import time: subcategory -> main category.
+# O(1) per value instead of scanning every nested group per row.
+subcategory_to_main = {
+    subcategory: main_category
+    for main_category, subcategories in industry_mapping.items()
+    for subcategory in subcategories
+}
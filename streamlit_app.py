@@ -1,12 +1,17 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import hashlib
 import json
+import re
+from functools import lru_cache
 from io import BytesIO
 from pathlib import Path
-from industry_mapping import industry_mapping
+from industry_mapping import subcategory_to_main
 from translations import translations
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 import os
 from dotenv import load_dotenv
 from os.path import join, dirname
@@ -14,10 +19,36 @@ from os.path import join, dirname
 # Set page configuration (must be the first Streamlit command)
 st.set_page_config(page_title="ExportZilla", layout="wide")
 
+# Prefer the Rust-backed calamine parser for xlsx reads; fall back to openpyxl
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = 'openpyxl'
+
+# Prefer xlsxwriter for writes (C-accelerated, noticeably faster than openpyxl).
+# Note: constant_memory mode is off because to_excel writes column-wise, which
+# that mode silently drops.
+try:
+    import xlsxwriter  # noqa: F401
+    EXCEL_WRITE_ENGINE = 'xlsxwriter'
+except ImportError:
+    EXCEL_WRITE_ENGINE = 'openpyxl'
+
+def write_xlsx(df: pd.DataFrame, buf: BytesIO):
+    df.to_excel(buf, index=False, engine=EXCEL_WRITE_ENGINE)
+
+# Prefer orjson for config I/O (parses UTF-8 bytes directly); fall back to stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # ---------- Configuration ----------
 CONFIG_PATH = Path('config.json')
 
-@st.cache_data(show_spinner=True)
+# cache_resource: singleton, so the returned dict is never deep-hashed on reruns
+@st.cache_resource(show_spinner=True)
 def load_config():
     default = {
         'email_blacklist': ['pr', 'hr', 'press'],
@@ -25,48 +56,114 @@ def load_config():
     }
     if CONFIG_PATH.exists():
         try:
+            if orjson is not None:
+                return orjson.loads(CONFIG_PATH.read_bytes())
             return json.loads(CONFIG_PATH.read_text())
-        except json.JSONDecodeError:
+        except ValueError:  # covers json.JSONDecodeError and orjson.JSONDecodeError
             st.warning('⚠️ config.json is invalid; using defaults!')
     return default
 
 def save_config(cfg: dict):
-    CONFIG_PATH.write_text(json.dumps(cfg, indent=2))
+    if orjson is not None:
+        CONFIG_PATH.write_bytes(orjson.dumps(cfg, option=orjson.OPT_INDENT_2))
+    else:
+        CONFIG_PATH.write_text(json.dumps(cfg, indent=2))
     load_config.clear()  # clear cache so new config is loaded
     return cfg
 
 # ---------- Data Processing ----------
 
+# Bucket prefixes by length once per distinct prefix map (it only changes on
+# Save Settings), keyed on the sorted items tuple
+@lru_cache(maxsize=8)
+def _prefix_buckets(prefix_items: tuple) -> dict:
+    by_len = {}
+    for pre, name in prefix_items:
+        if pre.startswith('+7'):
+            continue
+        pre = pre.replace(' ', '').replace('-', '')
+        by_len.setdefault(len(pre), {})[pre] = name
+    return by_len
+
 def detect_country(series: pd.Series, prefix_map: dict) -> pd.Series:
+    # Categorical result: value_counts/isin downstream run on int codes, not strings
+    categories = pd.unique(np.array(
+        list(prefix_map.values()) + ['Kazakhstan', 'Russian Federation', 'Unknown/No phone']
+    ))
+
+    # Short-circuit an all-null column (common on fresh sheets): nothing can
+    # resolve, so skip the normalization and prefix passes entirely
+    if series.isna().all():
+        return pd.Series(
+            pd.Categorical(np.full(len(series), 'Unknown/No phone'), categories=categories),
+            index=series.index
+        )
+
     s = series.fillna('').astype(str).str.replace(' ', '').str.replace('-', '')
     country = pd.Series('Unknown/No phone', index=series.index)
 
-    # Kazakhstan: +76 or +77 (no spaces)
-    mask_kz = s.str.startswith('+76') | s.str.startswith('+77') | s.str.startswith('+7 6') | s.str.startswith('+7 7')
+    # Kazakhstan: +76 or +77 (spaces/dashes already stripped)
+    mask_kz = s.str.startswith('+76') | s.str.startswith('+77')
     country[mask_kz] = 'Kazakhstan'
 
     # Russia: +7 but not +76/+77
     mask_ru = s.str.startswith('+7') & ~mask_kz
     country[mask_ru] = 'Russian Federation'
 
-    # Other prefixes
-    prefixes = sorted([k for k in prefix_map if not k.startswith('+7')], key=len, reverse=True)
-    for pre in prefixes:
-        mask = s.str.startswith(pre.replace(' ', '').replace('-', ''))
-        country[mask] = prefix_map[pre]
-
-    return country
+    # Each distinct prefix length is a single slice + dict map pass instead of
+    # one startswith scan per prefix (buckets memoized across calls)
+    by_len = _prefix_buckets(tuple(sorted(prefix_map.items())))
+
+    # Longest prefixes win; only fill slots that are still unresolved
+    result = country.to_numpy(copy=True)
+    unresolved = ~(mask_kz | mask_ru).to_numpy()
+    for k in sorted(by_len, reverse=True):
+        mapped = s.str.slice(0, k).map(by_len[k])
+        hit = mapped.notna().to_numpy() & unresolved
+        result = np.where(hit, mapped.to_numpy(), result)
+        unresolved &= ~hit
+
+    return pd.Series(pd.Categorical(result, categories=categories), index=series.index)
+
+# Compile the blacklist regex once per distinct blacklist (it only changes on Save Settings)
+@lru_cache(maxsize=8)
+def _blacklist_pattern(blacklist: tuple):
+    return re.compile('|'.join(re.escape(b) for b in blacklist), re.IGNORECASE)
+
+# Find columns that contain email addresses (text dtypes only, literal '@'
+# search). Only the first non-null values are scanned, bounding the cost per
+# column regardless of sheet height.
+def find_email_columns(df: pd.DataFrame, sample_size: int = 512) -> list:
+    email_cols = []
+    for c in df.columns:
+        if not (df[c].dtype == object or pd.api.types.is_string_dtype(df[c].dtype)):
+            continue
+        sample = df[c].dropna().head(sample_size)
+        if sample.str.contains('@', regex=False, na=False).any():
+            email_cols.append(c)
+    return email_cols
 
 # Email filtering function
-def filter_emails(df: pd.DataFrame, blacklist: list) -> pd.DataFrame:
-    email_cols = [c for c in df.columns if df[c].astype(str).str.contains('@', na=False).any()]
+def filter_emails(df: pd.DataFrame, blacklist: list, email_cols: list = None) -> pd.DataFrame:
+    if not blacklist:
+        return df
+    if email_cols is None:
+        email_cols = find_email_columns(df)
     if not email_cols:
         return df
+    # One compiled regex pass per column instead of a Python loop per cell;
+    # combine the per-column masks and slice once instead of copying per column
+    pattern = _blacklist_pattern(tuple(blacklist))
+    keep = np.ones(len(df), dtype=bool)
     for col in email_cols:
-        vals = df[col].astype(str).str.lower()
-        bad = vals.apply(lambda e: any(b in e for b in blacklist))
-        df = df[~bad]  # Remove rows where any blacklist word is found
-    return df
+        # email_cols are text dtype already, so no astype(str) pass is needed.
+        # Arrow-backed columns need the raw pattern string, not a re.Pattern.
+        if df[col].dtype == object:
+            bad = df[col].str.contains(pattern, na=False)
+        else:
+            bad = df[col].str.contains(pattern.pattern, case=False, na=False, regex=True)
+        keep &= ~bad.to_numpy()
+    return df.loc[keep]
 
 # Apply translations to column names
 def translate_columns(df: pd.DataFrame, t: dict) -> pd.DataFrame:
@@ -114,6 +211,12 @@ def translate_columns(df: pd.DataFrame, t: dict) -> pd.DataFrame:
     renamed_df = df.rename(columns=mapping)
     return renamed_df
 
+# Translate one low-cardinality column: build the lookup once per unique value,
+# then a single C-level map instead of a Python call per row
+def translate_unique(series: pd.Series, mapping: dict) -> pd.Series:
+    table = {u: mapping.get(str(u).strip(), u) for u in series.dropna().unique()}
+    return series.map(table)
+
 # Translate categories and countries in the DataFrame
 def translate_values(df: pd.DataFrame, t: dict) -> pd.DataFrame:
     # Ensure the DataFrame is not empty
@@ -122,46 +225,29 @@ def translate_values(df: pd.DataFrame, t: dict) -> pd.DataFrame:
 
     # Translate countries
     if t['column_country'] in df.columns:
-        df[t['column_country']] = df[t['column_country']].apply(
-            lambda x: t['countries'].get(str(x).strip(), x) if pd.notna(x) else x
-        )
+        df[t['column_country']] = translate_unique(df[t['column_country']], t['countries'])
 
     # Translate main categories
     if t['column_main_category'] in df.columns:
-        df[t['column_main_category']] = df[t['column_main_category']].apply(
-            lambda x: t['categories'].get(str(x).strip(), x) if pd.notna(x) else x
-        )
+        df[t['column_main_category']] = translate_unique(df[t['column_main_category']], t['categories'])
 
-    #Translate subcategories
+    # Translate subcategories: direct match first, then the "MainCat > SubCat"
+    # combo key, then the subcategory itself — all as vectorized maps
     if t['column_subcategory'] in df.columns:
-        # Try to translate using both the subcategory and the main category context
-        def translate_subcat(row):
-            subcat = str(row[t['column_subcategory']]).strip() if pd.notna(row[t['column_subcategory']]) else ""
-            maincat = str(row[t['column_main_category']]).strip() if pd.notna(row[t['column_main_category']]) else ""
-            # Try subcategory translation first
-            if subcat in t['subcategories']:
-                return t['subcategories'][subcat]
-            # Try translation as "MainCat > SubCat" if such keys exist in your translations
-            key_combo = f"{maincat} > {subcat}"
-            if key_combo in t['subcategories']:
-                return t['subcategories'][key_combo]
-            return subcat
-
-        df[t['column_subcategory']] = df.apply(translate_subcat, axis=1)
+        sub = df[t['column_subcategory']].astype('string').fillna('').str.strip()
+        main = df[t['column_main_category']].astype('string').fillna('').str.strip()
+        direct = sub.map(t['subcategories'])
+        combo = (main + ' > ' + sub).map(t['subcategories'])
+        df[t['column_subcategory']] = direct.fillna(combo).fillna(sub)
     return df
 
 def clean_website_column(df: pd.DataFrame, website_col: str) -> pd.DataFrame:
-    # Vectorized normalization of website column
+    # Vectorized normalization of website column: one regex pass extracts the
+    # base URL (protocol + domain); rows without a match keep their value.
+    # Named group: Arrow-backed str.extract rejects unnamed groups
     if website_col in df.columns:
-        def normalize_url(url):
-            if pd.notna(url) and '//' in url:
-                # Extract the base URL (protocol + domain)
-                parts = url.split('/')
-                return f"{parts[0]}//{parts[2]}/" if len(parts) > 2 else url
-            return url
-
-        # Apply normalization to the website column
-        df[website_col] = df[website_col].apply(normalize_url)
+        base = df[website_col].str.extract(r'^(?P<base>[^/]*//[^/]+)', expand=False)
+        df[website_col] = (base + '/').fillna(df[website_col])
     else:
         st.warning(f"⚠️ Column '{website_col}' not found in the DataFrame.")
     return df
@@ -179,21 +265,17 @@ def clean_address_columns(df: pd.DataFrame, t: dict) -> pd.DataFrame:
 
 
     if all(col in df.columns for col in [addr1, addr2, addr3, country]):
-        def replace_address(row):
-            if pd.notna(row[addr1]) and pd.notna(row[country]) and str(row[addr1]).strip() == str(row[country]).strip():
-                a2 = str(row[addr2]).strip() if pd.notna(row[addr2]) else ""
-                a3 = str(row[addr3]).strip() if pd.notna(row[addr3]) else ""
-                combined = (a2 + " " + a3).strip()
-                return combined
-            else:
-                a1 = str(row[addr1]).strip() if pd.notna(row[addr1]) else ""
-                a2 = str(row[addr2]).strip() if pd.notna(row[addr2]) else ""
-                a3 = str(row[addr3]).strip() if pd.notna(row[addr3]) else ""
-                combined = (a1 + " " + a2 + " " + a3).strip()
-                return combined
-
-        # Apply the replacement logic row-wise and update the DataFrame
-        df[addr1] = df.apply(replace_address, axis=1)
+        # Vectorized: strip all four columns once, then pick the combination per
+        # row with np.where instead of a Python call per row
+        a1 = df[addr1].astype('string').fillna('').str.strip()
+        a2 = df[addr2].astype('string').fillna('').str.strip()
+        a3 = df[addr3].astype('string').fillna('').str.strip()
+        c = df[country].astype('string').fillna('').str.strip()
+
+        combined_23 = (a2 + ' ' + a3).str.strip()
+        combined_all = (a1 + ' ' + a2 + ' ' + a3).str.strip()
+        df[addr1] = np.where((a1 == c).to_numpy() & (a1 != '').to_numpy(),
+                             combined_23.to_numpy(), combined_all.to_numpy())
 
         # Remove Address 2 and Address 3 columns
         df.drop(columns=[addr2, addr3], inplace=True)
@@ -204,16 +286,66 @@ def clean_address_columns(df: pd.DataFrame, t: dict) -> pd.DataFrame:
     else:
         st.warning(f"⚠️ One or more address/country columns are missing")
     return df
-# Updated process_file function with industry mapping
+# Counts only change when the processed frame changes, not on widget toggles,
+# so cache them instead of re-grouping on every rerun
 @st.cache_data(show_spinner=False)
+def compute_initial_counts(df: pd.DataFrame, main_col: str, sub_col: str, country_col: str):
+    category_counts = df.groupby([main_col, sub_col], observed=True).size().reset_index(name='Count')
+    if country_col in df.columns:
+        counts = df[country_col].value_counts()
+        country_counts = counts[counts > 0].reset_index(name='Count')
+    else:
+        country_counts = None
+    return category_counts, country_counts
+
+# Option list for a filter widget: categorical columns prune unused categories
+# on int codes; plain string columns (e.g. a re-uploaded export that skipped
+# classification) fall back to a value scan
+def category_options(series: pd.Series) -> list:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.remove_unused_categories().cat.categories.tolist()
+    return series.dropna().unique().tolist()
+
+def resolve_industry_column(df: pd.DataFrame):
+    """Resolve the raw industry column by name, falling back to position 13 for legacy sheets."""
+    for name in ('Column_12', 'Категория'):
+        if name in df.columns:
+            return name
+    if len(df.columns) > 13:
+        return df.columns[13]
+    return None
+
+def classify_industry(df: pd.DataFrame) -> pd.DataFrame:
+    # Categorical dtype: downstream isin/groupby/value_counts run on int codes
+    industry_column = resolve_industry_column(df)
+    if industry_column is not None:
+        df[t['column_main_category']] = df[industry_column].map(subcategory_to_main).fillna('Other').astype('category')
+        df[t['column_subcategory']] = df[industry_column].astype('category')
+    return df
+
+# Cache only the expensive, toggle-independent parse. hash_funcs: key the
+# cache on a cheap blake2b digest instead of letting Streamlit hash the
+# entire upload buffer on every rerun.
+@st.cache_data(show_spinner=False,
+               hash_funcs={bytes: lambda b: hashlib.blake2b(b, digest_size=16).digest()})
+def parse_excel(file_bytes: bytes) -> pd.DataFrame:
+    # Arrow-backed dtypes: text columns arrive as string dtype, so .str ops run
+    # on Arrow kernels instead of casting object columns on every scan
+    return pd.read_excel(BytesIO(file_bytes), engine=EXCEL_ENGINE, dtype_backend='pyarrow')
+
+# Updated process_file function with industry mapping. Deliberately uncached:
+# the cheap per-toggle transforms rerun on top of the cached parse, so the
+# cache holds one frame per upload instead of one per toggle combination.
 def process_file(file_bytes: bytes, cfg: dict, remove_empty_cols: bool,
                  remove_duplicates: bool,
                  filter_emails_step: bool, reset_index_step: bool) -> pd.DataFrame:
-    df = pd.read_excel(BytesIO(file_bytes), engine='openpyxl')
+    df = parse_excel(file_bytes)
 
     # 1. Remove mostly empty columns early
     if remove_empty_cols:
-        df = df.loc[:, df.notna().sum() >= 100]
+        # df.count() gives per-column non-NA totals without materializing a
+        # full boolean copy of the frame
+        df = df.loc[:, df.count() >= 100]
 
     # 2. Rename phone column (vectorized, no .apply)
     if 'Column_1' in df.columns:
@@ -224,38 +356,41 @@ def process_file(file_bytes: bytes, cfg: dict, remove_empty_cols: bool,
         phone_col = t["column_phone"]
     else:
         st.error('⚠️ "Column_1" is not present in the DataFrame.')
-        return df
+        # Still classify so the preview and counts downstream have their columns
+        return classify_industry(df)
     phone_cols = [t["column_phone"]]
 
     # 3. Remove duplicate rows based on email and phone number (vectorized)
-    email_cols = [c for c in df.columns if df[c].astype(str).str.contains('@', na=False).any()]
+    # Scan for email columns once and reuse the result for dedup and filtering;
+    # skip the scan entirely when neither step is enabled
+    email_cols = find_email_columns(df) if (remove_duplicates or filter_emails_step) else []
     if remove_duplicates and email_cols:
-        df.drop_duplicates(subset=[email_cols[0], phone_col], inplace=True)
+        # Hash the (email, phone) pair into one int64 column so dedup avoids
+        # building and hashing per-row Python tuples
+        key = pd.util.hash_pandas_object(df[[email_cols[0], phone_col]], index=False)
+        df = df.loc[~key.duplicated().to_numpy()]
 
-    # 4. Normalize phone numbers (vectorized)
-    def fix_phone_number(val):
-        val = str(val).strip()
-        if val and val.replace('+', '').isdigit() and not val.startswith('+'):
-            return '+' + val
-        return val
-    df[phone_col] = df[phone_col].astype(str).str.strip().apply(fix_phone_number)
+    # 4. Normalize phone numbers (vectorized): prepend '+' to all-digit values
+    phones = df[phone_col].astype(str).str.strip()
+    digits_only = phones.str.replace('+', '', regex=False).str.isdigit()
+    needs_plus = digits_only & ~phones.str.startswith('+')
+    df[phone_col] = np.where(needs_plus, '+' + phones, phones)
 
     # 5. Detect country (vectorized)
     df[t['column_country']] = detect_country(df[phone_col], cfg['phone_prefix_map'])
 
     # 6. Filter emails (vectorized)
     if filter_emails_step and email_cols:
-        vals = df[email_cols[0]].astype(str).str.lower()
-        bad = vals.apply(lambda e: any(b in e for b in cfg['email_blacklist']))
-        df = df[~bad]
+        df = filter_emails(df, cfg['email_blacklist'], email_cols)
 
-    # 7. Reset index (vectorized)
+    # 7. Reset index (RangeIndex stays O(1) in memory, unlike index arithmetic)
     if reset_index_step:
-        df.reset_index(drop=True, inplace=True)
-        df.index += 1
-        df.index.name = 'ID'
+        df.index = pd.RangeIndex(1, len(df) + 1, name='ID')
+
+    # 8. Classify industry once here so filter reruns reuse the cached columns
+    df = classify_industry(df)
 
-    # 8. Translate columns and values (vectorized)
+    # 9. Translate columns and values (vectorized)
     #df = translate_columns(df, t)
     #df = translate_values(df, t)
 
@@ -266,8 +401,16 @@ def process_file(file_bytes: bytes, cfg: dict, remove_empty_cols: bool,
 # Language selection
 language = st.sidebar.selectbox('🌐 Select Language', ['English', 'Русский'])
 
-# Get translations for the selected language
-t = translations[language]
+# Get translations for the selected language (re-resolved only on language change)
+if st.session_state.get('_lang') != language:
+    st.session_state['_lang'] = language
+    st.session_state['_t'] = translations[language]
+t = st.session_state['_t']
+
+# Invariant column-name lookups, resolved once instead of per use below
+col_country = t['column_country']
+col_main_category = t['column_main_category']
+col_subcategory = t['column_subcategory']
 
 # Update UI with translations
 st.title(t['title'])
@@ -313,41 +456,20 @@ if uploaded:
 
     # Save initial row counts for Main Category and Subcategory at the start of the app
     if uploaded:
-        # Initialize filtered_df with result_df
-        filtered_df = result_df.copy()
-        
-        # Ensure Main Category and Subcategory columns are added
-        industry_column = None
-        if "Column_12" in filtered_df.columns:
-            industry_column = "Column_12"
-        elif "Категория" in filtered_df.columns:
-            industry_column = "Категория"
-        elif len(filtered_df.columns) > 13:
-            industry_column = filtered_df.columns[13]
-        else:
-            st.error('Column_12 not found in the DataFrame1.')
-
-        # Only apply mapping if industry_column is set and columns are missing
-        if industry_column and (t['column_main_category'] not in filtered_df.columns or t['column_subcategory'] not in filtered_df.columns):
-            def map_to_main_and_subcategory(value):
-                for main_category, subcategories in industry_mapping.items():
-                    if value in subcategories.keys():
-                        return main_category, value
-                return "Other", value
-
-            filtered_df[[t['column_main_category'], t['column_subcategory']]] = filtered_df[industry_column].apply(
-                lambda x: pd.Series(map_to_main_and_subcategory(x))
+        # Save initial row counts for Main Category / Subcategory and countries
+        # (cached, read-only — no defensive copy needed). Guard on the columns:
+        # process_file can return without them when no industry column resolves.
+        if col_main_category in result_df.columns and col_subcategory in result_df.columns:
+            initial_category_counts, initial_country_counts = compute_initial_counts(
+                result_df, col_main_category, col_subcategory, col_country
             )
-        
-        # Save initial row counts for Main Category and Subcategory
-        initial_category_counts = filtered_df.groupby([t['column_main_category'], t['column_subcategory']]).size().reset_index(name='Count')
-        # Debug: Check if the country column exists
-        if t['column_country'] in filtered_df.columns:
-            # Save initial row counts for countries
-            initial_country_counts = filtered_df[t['column_country']].value_counts().reset_index(name='Count')
         else:
-            st.warning(f"⚠️ The column '{t['column_country']}' does not exist in the DataFrame.")
-            initial_country_counts = pd.DataFrame(columns=[t['column_country'], 'Count'])
+            st.error('Column_12 not found in the DataFrame1.')
+            initial_category_counts = pd.DataFrame(columns=[col_main_category, col_subcategory, 'Count'])
+            initial_country_counts = None
+        if initial_country_counts is None:
+            st.warning(f"⚠️ The column '{col_country}' does not exist in the DataFrame.")
+            initial_country_counts = pd.DataFrame(columns=[col_country, 'Count'])
 
     # Filtering Section
     #show_filters = st.toggle(t['show_filters'], value=True)  # Toggle for showing filters
@@ -356,123 +478,108 @@ if uploaded:
     rename_columns_toggle = st.toggle(t['rename_columns'], value=True)
     consolidate_rows = st.toggle(t['consolidate_rows_by_company'], value=False) 
 
-    # Initialize filtered_df with result_df
-    filtered_df = result_df.copy()
+    # st.cache_data already hands back a fresh copy per rerun, so no extra copy needed
+    filtered_df = result_df
 
-    
-    st.header(t['filter_preview'])
-
-    # Filter: Number of rows
-    max_rows = st.number_input(t['num_rows'], min_value=500, max_value=500000, value=500000)
+    # Remove unnecessary columns up front so every later scan, mask and copy
+    # moves fewer bytes (classification already happened in process_file)
+    if remove_columns_toggle:
+        unnecessary_columns = {
+            "Status", "Column_2", "Column_4", "Column_5", "Column_6", "Column_7", "Column_8", "Column_12",
+            "Имя", "Ключевые слова", "Заголовок", "META Description", "META Keywords", "Домен", "PHONES", "Категория", "Имя пользователя"
+        }
+        filtered_df = filtered_df.drop(columns=unnecessary_columns.intersection(filtered_df.columns), errors='ignore')
 
-    # Filter: Country selection
-    selected_countries = []
-    if t['column_country'] in result_df.columns:
-        available_countries = result_df[t['column_country']].dropna().unique().tolist()
-        selected_countries = st.multiselect(t['filter_country'], available_countries)
-    
+    st.header(t['filter_preview'])
 
-    # Ensure Main Category and Subcategory columns are added
-    industry_column = None
-    if "Column_12" in filtered_df.columns:
-        industry_column = "Column_12"
-    elif "Категория" in filtered_df.columns:
-        industry_column = "Категория"
-    else:
+    # Main Category / Subcategory are added once inside process_file
+    if col_main_category not in filtered_df.columns or col_subcategory not in filtered_df.columns:
         st.error('Column_12 not found in the DataFrame2.')
 
-    # Only apply mapping if industry_column is set and columns are missing
-    if industry_column and (t['column_main_category'] not in filtered_df.columns or t['column_subcategory'] not in filtered_df.columns):
-        def map_to_main_and_subcategory(value):
-            for main_category, subcategories in industry_mapping.items():
-                if value in subcategories.keys():
-                    return main_category, value
-            return "Other", value
-
-        filtered_df[[t['column_main_category'], t['column_subcategory']]] = filtered_df[industry_column].apply(
-            lambda x: pd.Series(map_to_main_and_subcategory(x))
-        )
-
     # Print all unique subcategories that fall under the "Other" main category
-    if t['column_main_category'] in filtered_df.columns and t['column_subcategory'] in filtered_df.columns:
+    if col_main_category in filtered_df.columns and col_subcategory in filtered_df.columns:
         other_subcats = filtered_df.loc[
-            filtered_df[t['column_main_category']] == "Other", t['column_subcategory']
+            filtered_df[col_main_category] == "Other", col_subcategory
         ].dropna().unique().tolist()
         print("Unique subcategories under 'Other':", other_subcats)
-    
-    # Filter: Main Category and Subcategory with counts
-    if t['column_main_category'] in filtered_df.columns and t['column_subcategory'] in filtered_df.columns:
-        # Get available main categories with counts
-        main_category_counts = initial_category_counts.groupby(t['column_main_category'])['Count'].sum().to_dict()
-        available_main_categories = filtered_df[t['column_main_category']].dropna().unique().tolist()
-        selected_main_categories = []
-
-        st.subheader(t['select_main_categories'])
-        for category in available_main_categories:
-            count = main_category_counts.get(category, 0)
-            # Translate the category for display
-            display_category = t['categories'].get(category, category)
-            if st.checkbox(f"{display_category} ({count})", key=f"main_category_{category}"):
-                selected_main_categories.append(category)
-
-        selected_subcategories = []
-        if selected_main_categories:
-            for main_category in selected_main_categories:
-                # Translate the main category for display
-                display_main_category = t['categories'].get(main_category, main_category)
-                st.subheader(f"{t['subcategories_for']} {display_main_category}")
-                # Get available subcategories for the selected main category with counts
-                subcategory_counts = initial_category_counts[initial_category_counts[t['column_main_category']] == main_category].set_index(t['column_subcategory'])['Count'].to_dict()
-                available_subcategories = filtered_df[filtered_df[t['column_main_category']] == main_category][t['column_subcategory']].dropna().unique().tolist()
-                for subcategory in available_subcategories:
-                    count = subcategory_counts.get(subcategory, 0)
-                    # Translate the subcategory for display
-                    display_subcategory = t['subcategories'].get(subcategory, subcategory)
-                    if st.checkbox(f"{display_subcategory} ({count})", key=f"subcategory_{main_category}_{subcategory}"):
-                        selected_subcategories.append(subcategory)
+
+    # Batch every filter widget in one form: the script reruns once per Apply
+    # click instead of once per checkbox/selectbox interaction
+    with st.form("filters"):
+        # Filter: Number of rows
+        max_rows = st.number_input(t['num_rows'], min_value=500, max_value=500000, value=500000)
+
+        # Filter: Country selection
+        selected_countries = []
+        if col_country in result_df.columns:
+            available_countries = category_options(result_df[col_country])
+            selected_countries = st.multiselect(t['filter_country'], available_countries)
+
+        # Filter: Main Category and Subcategory with counts. One multiselect per
+        # level renders two widgets instead of one checkbox per category.
+        if col_main_category in filtered_df.columns and col_subcategory in filtered_df.columns:
+            # Get available main categories with counts
+            main_category_counts = initial_category_counts.groupby(col_main_category, observed=True)['Count'].sum().to_dict()
+            available_main_categories = category_options(filtered_df[col_main_category])
+
+            selected_main_categories = st.multiselect(
+                t['select_main_categories'],
+                available_main_categories,
+                format_func=lambda c: f"{t['categories'].get(c, c)} ({main_category_counts.get(c, 0)})",
+                key='main_categories'
+            )
+
+            selected_subcategories = []
+            if selected_main_categories:
+                display_mains = ', '.join(t['categories'].get(c, c) for c in selected_main_categories)
+                in_selected = initial_category_counts[col_main_category].isin(selected_main_categories)
+                subcategory_counts = initial_category_counts[in_selected].groupby(col_subcategory, observed=True)['Count'].sum().to_dict()
+                available_subcategories = category_options(filtered_df.loc[
+                    filtered_df[col_main_category].isin(selected_main_categories), col_subcategory
+                ])
+                selected_subcategories = st.multiselect(
+                    f"{t['subcategories_for']} {display_mains}",
+                    available_subcategories,
+                    format_func=lambda s: f"{t['subcategories'].get(s, s)} ({subcategory_counts.get(s, 0)})",
+                    key='subcategories'
+                )
+            else:
+                selected_subcategories = None
         else:
+            selected_main_categories = None
             selected_subcategories = None
-    else:
-        selected_main_categories = None
-        selected_subcategories = None
 
-    # Apply filters
+        st.form_submit_button(t['apply_filters'])
+
+    # Apply filters: build one combined mask and materialize the frame once
+    mask = np.ones(len(filtered_df), dtype=bool)
     if selected_countries:
-        filtered_df = filtered_df[filtered_df[t['column_country']].isin(selected_countries)]
+        mask &= filtered_df[col_country].isin(selected_countries).to_numpy()
 
     if selected_main_categories:
-        filtered_df = filtered_df[filtered_df[t['column_main_category']].isin(selected_main_categories)]
+        mask &= filtered_df[col_main_category].isin(selected_main_categories).to_numpy()
 
     if selected_subcategories:
-        filtered_df = filtered_df[filtered_df[t['column_subcategory']].isin(selected_subcategories)]
+        mask &= filtered_df[col_subcategory].isin(selected_subcategories).to_numpy()
 
     # Limit the number of rows
-    filtered_df = filtered_df.head(max_rows)
+    filtered_df = filtered_df.loc[mask].head(max_rows)
 
-    # Remove unnecessary columns from the filtered DataFrame      
-    if remove_columns_toggle:
-        columns_to_drop = [col for col in filtered_df.columns if col in [
-            "Status", "Column_2", "Column_4", "Column_5", "Column_6", "Column_7", "Column_8", "Column_12", 
-            "Имя", "Ключевые слова", "Заголовок", "META Description", "META Keywords", "Домен", "PHONES", "Категория", "Имя пользователя"
-            ]]
-        filtered_df = filtered_df.drop(columns=columns_to_drop, axis=1)
-    # Rename columns
+    # Rename columns: build the full mapping in one scan, then rename once
     if rename_columns_toggle:
-        filtered_df.rename(columns={
-            col: t['column_websites'] for col in filtered_df.columns if 'Column_3' in col or 'Источник' in col
-        }, inplace=True)
-        filtered_df.rename(columns={
-            col: t['column_address_1'] for col in filtered_df.columns if 'Column_9' in col #or 'Страна' in col
-        }, inplace=True)
-        filtered_df.rename(columns={
-            col: t['column_address_2'] for col in filtered_df.columns if 'Column_10' in col or 'Город' in col
-        }, inplace=True)
-        filtered_df.rename(columns={
-            col: t['column_address_3'] for col in filtered_df.columns if 'Column_11' in col or 'Индекс' in col # 'Адрес' in col
-        }, inplace=True)
-        filtered_df.rename(columns={
-            col: t['column_email'] for col in filtered_df.columns if 'Email' in col or 'Значение' in col
-        }, inplace=True)
+        rename_map = {}
+        for col in filtered_df.columns:
+            if 'Column_3' in col or 'Источник' in col:
+                rename_map[col] = t['column_websites']
+            elif 'Column_9' in col:  # or 'Страна' in col
+                rename_map[col] = t['column_address_1']
+            elif 'Column_10' in col or 'Город' in col:
+                rename_map[col] = t['column_address_2']
+            elif 'Column_11' in col or 'Индекс' in col:  # 'Адрес' in col
+                rename_map[col] = t['column_address_3']
+            elif 'Email' in col or 'Значение' in col:
+                rename_map[col] = t['column_email']
+        filtered_df.rename(columns=rename_map, inplace=True)
 
     filtered_df = clean_address_columns(filtered_df, t)
     filtered_df = clean_website_column(filtered_df, t['column_websites'])
@@ -488,60 +595,42 @@ if uploaded:
         websites_exists = websites_col in filtered_df.columns
 
         if email_exists or websites_exists:
-            # Extract company identifiers
-            def extract_email_domain(email):
-                if pd.notna(email) and '@' in email:
-                    return email.split('@')[-1].lower()
-                return None
-
-            def normalize_url(url):
-                if pd.notna(url):
-                    # Remove paths and normalize the URL
-                    return url.split('/')[2].lower() if '//' in url else url.lower()
-                return None
-
             # List of common/free email domains
             free_email_domains = {
                 "gmail.com", "hotmail.com", "yahoo.com", "outlook.com", "aol.com", "icloud.com", "mail.ru", "yandex.ru",
                 "protonmail.com", "zoho.com", "gmx.com", "mail.com", "bk.ru", "inbox.ru", "list.ru", "rambler.ru"
             }
 
-            def extract_company_identifier(row):
-                email = row[email_col] if email_exists else None
-                website = row[websites_col] if websites_exists else None
-                # Use website domain if available
-                if pd.notna(website):
-                    return normalize_url(website)
-                # Use email domain only if not a free domain
-                if pd.notna(email) and '@' in email:
-                    domain = email.split('@')[-1].lower()
-                    if domain not in free_email_domains:
-                        return domain
-                return None
+            # Vectorized identifier extraction: website netloc wins, otherwise a
+            # non-free email domain. Named-group extracts instead of rsplit/.str[-1]
+            # so the Arrow-backed string columns stay on extract's kernel path
+            identifier = pd.Series(None, index=filtered_df.index, dtype=object)
+            if email_exists:
+                domains = filtered_df[email_col].str.extract(
+                    r'@(?P<domain>[^@]+)$', expand=False).str.lower()
+                identifier = domains.where(~domains.isin(free_email_domains))
+            if websites_exists:
+                sites = filtered_df[websites_col].str.lower()
+                netloc = sites.str.extract(r'//(?P<netloc>[^/]+)', expand=False).fillna(sites)
+                identifier = netloc.where(netloc.notna(), identifier)
 
             # Create a new column for company grouping
-            filtered_df[company_identifier_col] = filtered_df.apply(extract_company_identifier, axis=1)
+            filtered_df[company_identifier_col] = identifier
 
             # Drop rows where the company identifier is missing
             filtered_df = filtered_df.dropna(subset=[company_identifier_col])
 
-            # Group by the company identifier
-            company_group = filtered_df.groupby(company_identifier_col, as_index=False)
-
             def consolidate_column(series):
-                unique_values = series.dropna().unique()
-                return '; '.join(unique_values)
-
-            # Consolidate emails, phone numbers, and websites
-            if email_exists:
-                filtered_df[email_col] = company_group[email_col].transform(consolidate_column)
-            if t['column_phone'] in filtered_df.columns:
-                filtered_df[t['column_phone']] = company_group[t['column_phone']].transform(consolidate_column)
-            if websites_exists:
-                filtered_df[websites_col] = company_group[websites_col].transform(consolidate_column)
-
-            # Drop duplicate rows after consolidation
-            filtered_df = filtered_df.drop_duplicates(subset=[company_identifier_col])
+                return '; '.join(pd.unique(series.dropna().astype(str)))
+
+            # One hash-group pass: join emails/phones/websites per company, keep
+            # the first value of every other column (replaces transform + dedup)
+            consolidate_cols = {email_col, t['column_phone'], websites_col}
+            agg_map = {
+                c: consolidate_column if c in consolidate_cols else 'first'
+                for c in filtered_df.columns if c != company_identifier_col
+            }
+            filtered_df = filtered_df.groupby(company_identifier_col, as_index=False, sort=False).agg(agg_map)
 
             # Drop the temporary 'Company Identifier' column
             filtered_df.drop(columns=[company_identifier_col], inplace=True)
@@ -557,19 +646,18 @@ if uploaded:
         st.dataframe(filtered_df)
     
     # Translate main categories and subcategories in filtered_df for preview (after all filtering and mapping)
-    if t['column_main_category'] in filtered_df.columns:
-        filtered_df[t['column_main_category']] = filtered_df[t['column_main_category']].apply(
-            lambda x: t['categories'].get(str(x).strip(), x) if pd.notna(x) else x
-        )
-    if t['column_subcategory'] in filtered_df.columns:
-        filtered_df[t['column_subcategory']] = filtered_df[t['column_subcategory']].apply(
-            lambda x: t['subcategories'].get(str(x).strip(), x) if pd.notna(x) else x
-        )
-    # Download filtered file
-    buf = BytesIO()
-    filtered_df.to_excel(buf, index=False, engine='openpyxl')
-    buf.seek(0)
-    st.download_button(t['download_file'], buf,
+    if col_main_category in filtered_df.columns:
+        filtered_df[col_main_category] = translate_unique(filtered_df[col_main_category], t['categories'])
+    if col_subcategory in filtered_df.columns:
+        filtered_df[col_subcategory] = translate_unique(filtered_df[col_subcategory], t['subcategories'])
+    # Download filtered file (cached so identical filter states skip the rebuild)
+    @st.cache_data(show_spinner=False)
+    def build_download_xlsx(df: pd.DataFrame) -> bytes:
+        buf = BytesIO()
+        write_xlsx(df, buf)
+        return buf.getvalue()
+
+    st.download_button(t['download_file'], build_download_xlsx(filtered_df),
                        'filtered_processed.xlsx',
                        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
@@ -596,14 +684,19 @@ if uploaded:
         )
         cur.execute(create_table)
 
-        # Insert data (append)
-        for _, row in df.iterrows():
-            insert = sql.SQL("INSERT INTO {} ({}) VALUES ({});").format(
-                sql.Identifier(table_name),
-                sql.SQL(', ').join(columns),
-                sql.SQL(', ').join(sql.Placeholder() * len(columns))
-            )
-            cur.execute(insert, [str(x) if x is not None else None for x in row])
+        # Insert data (append) in batches: one round-trip per page instead of
+        # one statement parse + round-trip per row
+        insert = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+            sql.Identifier(table_name),
+            sql.SQL(', ').join(columns)
+        )
+        # Columns are created as TEXT, so stringify every non-null value
+        data = df.astype(object).where(df.notna(), None)
+        rows = (
+            [str(x) if x is not None else None for x in row]
+            for row in data.itertuples(index=False, name=None)
+        )
+        execute_values(cur, insert, rows, page_size=1000)
         conn.commit()
         cur.close()
         conn.close()
@@ -627,7 +720,7 @@ if uploaded:
 
     # Count rows per country
     show_country_counts = st.toggle(t['rows_per_country'], value=False)
-    if show_country_counts and t['column_country'] in filtered_df.columns:
+    if show_country_counts and col_country in filtered_df.columns:
 
         # Display the counts
         st.subheader(t['rows_per_country'])
@@ -635,7 +728,7 @@ if uploaded:
 
     # Count rows per Main Category and Subcategory based on filtered preview
     show_category_counts = st.toggle(t['rows_per_category'], value=False)
-    if show_category_counts and t['column_main_category'] in filtered_df.columns and t['column_subcategory'] in filtered_df.columns:
+    if show_category_counts and col_main_category in filtered_df.columns and col_subcategory in filtered_df.columns:
 
         # Display the counts
         st.subheader(t['rows_per_category'])
@@ -643,7 +736,7 @@ if uploaded:
 
         # Download button for category counts
         cat_buf = BytesIO()
-        initial_category_counts.to_excel(cat_buf, index=False, engine='openpyxl')
+        write_xlsx(initial_category_counts, cat_buf)
         cat_buf.seek(0)
         st.download_button(
             label="Download Category Counts",
@@ -20,6 +20,7 @@ translations = {
         "filter_preview": "🔍 Filter Preview",
         "num_rows": "Maximum Rows to Display",
         "filter_country": "Filter by Country",
+        "apply_filters": "Apply Filters",
         "show_filters": "Show Filters",
         "filtered_preview": "Filtered Data Preview",
         "download_file": "📥 Download Processed File",
@@ -755,6 +756,7 @@ translations = {
         "filter_preview": "🔍 Предварительный просмотр фильтра",
         "num_rows": "Максимальное количество строк для отображения",
         "filter_country": "Фильтр по стране",
+        "apply_filters": "Применить фильтры",
         "show_filters": "Показать фильтры",
         "filtered_preview": "Предварительный просмотр отфильтрованных данных",
         "download_file": "📥 Скачать обработанный файл",